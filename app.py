@@ -2,7 +2,12 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
+import pyarrow as pa
+import pyarrow.csv as pv
+import numba
+from numba import njit, prange
 from datetime import datetime
+import io
 import os
 
 # Page configuration
@@ -18,21 +23,72 @@ def validate_and_transform_data(df):
     """Data validation and transformation"""
     # Article field forced to 12-digit text format
     if 'Article' in df.columns:
-        df['Article'] = df['Article'].astype(str).str.zfill(12)
+        article = df['Article']
+        if article.dtype.kind in 'iu' and not article.hasnans:
+            # Integer article numbers are padded with NumPy's vectorized string routines
+            article = np.char.zfill(article.to_numpy().astype(str), 12)
+        else:
+            article = article.astype(str).str.zfill(12)
+        # Arrow-backed strings hash faster than object dtype when grouping
+        df['Article'] = pd.Series(article, index=df.index, dtype='string[pyarrow]')
     
     # Numeric field processing
     numeric_columns = ['Inventory', 'Sales', 'Safety Stock', 'Pending Received']
-    for col in numeric_columns:
-        if col in df.columns:
-            # Convert non-numeric to NaN
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-            # Fill missing values
-            df[col] = df[col].fillna(0)
-            # Correct outliers (negative values to 0)
-            df[col] = df[col].clip(lower=0)
-    
+    cols = [col for col in numeric_columns if col in df.columns]
+    if cols:
+        # Convert non-numeric to NaN, as one writable float64 block
+        values = df[cols].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64, copy=True)
+        # Fill missing values
+        np.nan_to_num(values, copy=False, nan=0.0)
+        # Correct outliers (negative values to 0)
+        np.maximum(values, 0.0, out=values)
+        df[cols] = values
+
     return df
 
+# Greedy matching kernel, compiled with Numba
+@njit(cache=True)
+def _match(supplier_rows, supplier_avail, receiver_rows, receiver_need, out_sup, out_rcv, out_qty, k):
+    """Match receivers to suppliers in order, writing supplier row, receiver row and quantity from position k; returns the new count"""
+    remaining_supply = supplier_avail.copy()
+    
+    for j in range(receiver_rows.shape[0]):
+        remaining_need = receiver_need[j]
+        
+        for i in range(supplier_rows.shape[0]):
+            if remaining_supply[i] > 0 and remaining_need > 0:
+                transfer_amount = min(remaining_supply[i], remaining_need)
+                out_sup[k] = supplier_rows[i]
+                out_rcv[k] = receiver_rows[j]
+                out_qty[k] = transfer_amount
+                k += 1
+                remaining_need -= transfer_amount
+                remaining_supply[i] -= transfer_amount
+                
+                if remaining_need <= 0:
+                    break
+    
+    return k
+
+# Per-group matching; groups share no state, so they run in parallel across cores.
+# OpenMP is preferred as the threading layer: TBB can hang interpreter shutdown
+# when kernels are launched from Streamlit's script thread
+numba.config.THREADING_LAYER_PRIORITY = ['omp', 'tbb', 'workqueue']
+
+@njit(parallel=True, cache=True)
+def _match_groups(order, starts, ends, available_sorted, available, offsets, out_sup, out_rcv, out_qty, counts):
+    """Run _match for every group; group g writes its transfers from offsets[g] and stores how many in counts[g]"""
+    for g in prange(starts.shape[0]):
+        group_rows = order[starts[g]:ends[g]]
+        group_avail = available_sorted[starts[g]:ends[g]]
+        
+        # Identify suppliers and receivers
+        sup_rows = group_rows[group_avail > 0]
+        rcv_rows = group_rows[group_avail < 0]
+        
+        counts[g] = _match(sup_rows, available[sup_rows], rcv_rows, -available[rcv_rows],
+                           out_sup, out_rcv, out_qty, offsets[g]) - offsets[g]
+
 # Transfer logic engine
 class TransferOptimizer:
     def __init__(self, safety_stock_threshold=1.2):
@@ -40,74 +96,95 @@ class TransferOptimizer:
     
     def calculate_transfer_needs(self, df):
         """Calculate transfer needs"""
-        results = []
+        # Available stock for every row in one vectorized pass
+        inventory = df['Inventory'].to_numpy(dtype=np.float64, copy=False)
+        sales = df['Sales'].to_numpy(dtype=np.float64, copy=False)
+        available = inventory - sales * self.safety_stock_threshold
+        articles = df['Article'].astype('category')
+        oms = df['OM'].astype('category')
         
-        # Group by Article+OM
-        grouped = df.groupby(['Article', 'OM'])
+        # Locations as integer codes into sorted loc_uniques (missing values get -1)
+        if 'Location' in df.columns:
+            loc_codes, loc_uniques = pd.factorize(df['Location'], sort=True)
+        else:
+            loc_codes = np.zeros(len(df), dtype=np.int64)
+            loc_uniques = pd.Index(['Unknown'])
         
-        for (article, om), group in grouped:
-            total_stock = group['Inventory'].sum()
-            total_sales = group['Sales'].sum()
-            safety_stock = total_sales * self.safety_stock_threshold
-            
-            # Identify suppliers (sufficient inventory) and receivers (insufficient inventory)
-            suppliers = []
-            receivers = []
-            
-            for _, row in group.iterrows():
-                available_stock = row['Inventory'] - (row['Sales'] * self.safety_stock_threshold)
-                
-                if available_stock > 0:
-                    suppliers.append({
-                        'location': row.get('Location', 'Unknown'),
-                        'available_stock': available_stock,
-                        'current_stock': row['Inventory']
-                    })
-                elif available_stock < 0:
-                    receivers.append({
-                        'location': row.get('Location', 'Unknown'),
-                        'needed_stock': -available_stock,
-                        'current_stock': row['Inventory']
-                    })
-            
-            # Match transfers
-            transfer_suggestions = self.match_transfers(suppliers, receivers, article, om)
-            results.extend(transfer_suggestions)
+        # Group by Article+OM as integer codes, numbered in order of first appearance;
+        # categorical keys avoid string comparisons, and rows with a missing key get NaN and are dropped
+        codes = df.groupby([articles, oms], sort=False, observed=True).ngroup().to_numpy()
+        rows = np.flatnonzero(codes >= 0)
+        order = rows[np.argsort(codes[rows], kind='stable')]
+        codes_sorted = codes[order]
+        # Group boundaries are the positions where the sorted code changes
+        starts = np.flatnonzero(np.diff(codes_sorted, prepend=-1))
+        ends = np.append(starts[1:], len(order))
         
-        return pd.DataFrame(results)
-    
-    def match_transfers(self, suppliers, receivers, article, om):
-        """Match suppliers and receivers"""
-        suggestions = []
+        # Count suppliers (sufficient inventory) and receivers (insufficient inventory) per group;
+        # groups with only one side have nothing to match and are skipped
+        available_sorted = available[order]
+        n_suppliers = np.add.reduceat(available_sorted > 0, starts, dtype=np.int64)
+        n_receivers = np.add.reduceat(available_sorted < 0, starts, dtype=np.int64)
+        active = (n_suppliers > 0) & (n_receivers > 0)
         
-        for receiver in receivers:
-            needed = receiver['needed_stock']
-            remaining_need = needed
-            
-            for supplier in suppliers:
-                if supplier['available_stock'] > 0 and remaining_need > 0:
-                    transfer_amount = min(supplier['available_stock'], remaining_need)
-                    
-                    suggestion = {
-                        'Article': article,
-                        'OM': om,
-                        'Transfer Location': supplier['location'],
-                        'Receive Location': receiver['location'],
-                        'Suggested Transfer Quantity': transfer_amount,
-                        'Transfer Current Stock': supplier['current_stock'],
-                        'Receive Current Stock': receiver['current_stock'],
-                        'Receive Needed Qty': receiver['needed_stock'],
-                        'Priority': 'Emergency' if receiver['needed_stock'] > receiver['current_stock'] else 'Potential'
-                    }
-                    
-                    suggestions.append(suggestion)
-                    remaining_need -= transfer_amount
-                    supplier['available_stock'] -= transfer_amount
-                    
-                    if remaining_need <= 0:
-                        break
+        # Match transfers
+        sup, rcv, qty = self.match_transfers(
+            order, starts[active], ends[active], available_sorted, available,
+            (n_suppliers + n_receivers)[active]
+        )
+        receive_stock = inventory[rcv]
+        receive_needed = -available[rcv]
+        
+        # Compact dtypes: categoricals for the repeating keys and locations, float32 for quantities
+        transfer_df = pd.DataFrame({
+            'Article': articles.array[rcv],
+            'OM': oms.array[rcv],
+            'Transfer Location': pd.Categorical.from_codes(loc_codes[sup], categories=loc_uniques),
+            'Receive Location': pd.Categorical.from_codes(loc_codes[rcv], categories=loc_uniques),
+            'Suggested Transfer Quantity': qty.astype(np.float32),
+            'Transfer Current Stock': inventory[sup],
+            'Receive Current Stock': receive_stock,
+            'Receive Needed Qty': receive_needed,
+            # Emergency when the receiver needs more than it currently holds
+            'Priority': pd.Categorical.from_codes(
+                (receive_needed > receive_stock).astype(np.int8), categories=['Potential', 'Emergency']
+            )
+        })
         
-        return suggestions
+        return transfer_df
+    
+    def match_transfers(self, order, starts, ends, available_sorted, available, capacity):
+        """Match suppliers and receivers of every group; returns supplier rows, receiver rows and quantities"""
+        # Each group gets its own slice of the output buffers, so the parallel kernel never contends;
+        # every transfer either exhausts a supplier or fills a receiver, which bounds a group's slice
+        offsets = np.cumsum(capacity) - capacity
+        size = int(capacity.sum())
+        out_sup = np.empty(size, dtype=np.int64)
+        out_rcv = np.empty(size, dtype=np.int64)
+        out_qty = np.empty(size, dtype=np.float64)
+        counts = np.zeros(len(starts), dtype=np.int64)
+        _match_groups(order, starts, ends, available_sorted, available, offsets,
+                      out_sup, out_rcv, out_qty, counts)
+        
+        # Keep the filled front of each group's slice, in group order
+        filled = np.arange(size) - np.repeat(offsets, capacity) < np.repeat(counts, capacity)
+        return out_sup[filled], out_rcv[filled], out_qty[filled]
+
+# Cached pipeline steps, so widget interactions do not redo them on every rerun
+@st.cache_data
+def load_data(file_bytes):
+    """Read and validate the uploaded Excel file, keyed on its contents"""
+    try:
+        # Rust-based calamine parser (pandas >= 2.2 with python-calamine installed)
+        df = pd.read_excel(io.BytesIO(file_bytes), engine='calamine')
+    except (ImportError, ValueError):
+        df = pd.read_excel(io.BytesIO(file_bytes), engine='openpyxl')
+    return validate_and_transform_data(df)
+
+@st.cache_data
+def compute_transfers(df, safety_threshold):
+    """Calculate transfer suggestions, keyed on the data and safety stock coefficient"""
+    return TransferOptimizer(safety_threshold).calculate_transfer_needs(df)
 
 # Main Application
 def main():
@@ -133,37 +210,34 @@ def main():
     
     if uploaded_file is not None:
         try:
-            # Read Excel file
-            df = pd.read_excel(uploaded_file)
+            # Read Excel file, with data validation and transformation
+            df = load_data(uploaded_file.getvalue())
             
-            # Data validation and transformation
-            df = validate_and_transform_data(df)
-            
-            # Display data preview
-            st.subheader("Data Preview")
-            st.dataframe(df.head(), use_container_width=True)
-            
-            # Initialize transfer optimizer
-            optimizer = TransferOptimizer(safety_threshold)
+            # Display data preview, collapsed by default
+            with st.expander("Data Preview", expanded=False):
+                st.table(df.head(5))
             
             # Calculate transfer suggestions
             with st.spinner("Calculating transfer suggestions..."):
-                transfer_results = optimizer.calculate_transfer_needs(df)
+                transfer_results = compute_transfers(df, safety_threshold)
             
             if not transfer_results.empty:
                 # Display transfer suggestions
                 st.subheader("Transfer Suggestions")
                 st.dataframe(transfer_results, use_container_width=True)
                 
-                # Statistics
+                # Statistics, read from the categorical codes and the quantity array without copies
+                priority = transfer_results['Priority'].array
+                priority_counts = np.bincount(priority.codes, minlength=len(priority.categories))
+                quantities = transfer_results['Suggested Transfer Quantity'].to_numpy(copy=False)
                 col1, col2, col3 = st.columns(3)
                 with col1:
                     st.metric("Total Transfer Suggestions", len(transfer_results))
                 with col2:
                     st.metric("Urgent Transfers", 
-                             len(transfer_results[transfer_results['Priority'] == 'Emergency']))
+                             int(priority_counts[priority.categories.get_loc('Emergency')]))
                 with col3:
-                    total_transfer = transfer_results['Suggested Transfer Quantity'].sum()
+                    total_transfer = quantities.sum()
                     st.metric("Total Transfer Quantity", f"{total_transfer:,.0f}")
                 
                 # Visualization analysis
@@ -172,36 +246,47 @@ def main():
                 tab1, tab2, tab3 = st.tabs(["Priority Distribution", "Transfer Quantity Distribution", "Location Analysis"])
                 
                 with tab1:
-                    priority_counts = transfer_results['Priority'].value_counts()
                     fig1 = px.pie(
-                        values=priority_counts.values,
-                        names=priority_counts.index,
+                        values=priority_counts,
+                        names=np.asarray(priority.categories),
                         title="Transfer Priority Distribution"
                     )
                     st.plotly_chart(fig1, use_container_width=True)
                 
                 with tab2:
-                    fig2 = px.histogram(
-                        transfer_results, 
-                        x='Suggested Transfer Quantity',
-                        title="Transfer Quantity Distribution",
-                        nbins=20
+                    # Bin server-side so only the 20 bin counts are sent to the browser
+                    counts, edges = np.histogram(quantities, bins=20)
+                    fig2 = px.bar(
+                        x=0.5 * (edges[:-1] + edges[1:]),
+                        y=counts,
+                        labels={'x': 'Suggested Transfer Quantity', 'y': 'count'},
+                        title="Transfer Quantity Distribution"
                     )
+                    fig2.update_traces(width=edges[1] - edges[0])
                     st.plotly_chart(fig2, use_container_width=True)
                 
                 with tab3:
-                    location_stats = transfer_results.groupby('Transfer Location')['Suggested Transfer Quantity'].sum().reset_index()
+                    loc_codes, loc_labels = pd.factorize(transfer_results['Transfer Location'], sort=True)
+                    has_loc = loc_codes >= 0
+                    loc_totals = np.bincount(
+                        loc_codes[has_loc],
+                        weights=quantities[has_loc],
+                        minlength=len(loc_labels)
+                    )
                     fig3 = px.bar(
-                        location_stats,
-                        x='Transfer Location',
-                        y='Suggested Transfer Quantity',
+                        x=np.asarray(loc_labels),
+                        y=loc_totals,
+                        labels={'x': 'Transfer Location', 'y': 'Suggested Transfer Quantity'},
                         title="Transfer Out Quantity by Location"
                     )
                     st.plotly_chart(fig3, use_container_width=True)
                 
                 # Export function
                 st.subheader("Export Results")
-                csv = transfer_results.to_csv(index=False).encode('utf-8')
+                # Arrow's CSV writer encodes straight into the buffer, without an intermediate Python string
+                buffer = io.BytesIO()
+                pv.write_csv(pa.Table.from_pandas(transfer_results, preserve_index=False), buffer)
+                csv = buffer.getvalue()
                 st.download_button(
                     label="Download Transfer Suggestions CSV",
                     data=csv,
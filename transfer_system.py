@@ -61,11 +61,9 @@ class TransferOptimizer:
             if col in df.columns:
                 df[col] = df[col].astype(str).fillna("").str.strip()
         
-        # Add effective sales quantity field
-        df['Effective Sold Qty'] = df.apply(
-            lambda row: row['Last Month Sold Qty'] if row['Last Month Sold Qty'] > 0 
-            else row['MTD Sold Qty'], axis=1
-        )
+        # Add effective sales quantity field: last month's sales, else month-to-date
+        last_month_sold = df['Last Month Sold Qty'].to_numpy()
+        df['Effective Sold Qty'] = np.where(last_month_sold > 0, last_month_sold, df['MTD Sold Qty'].to_numpy())
         
         return df
     
@@ -74,6 +72,11 @@ class TransferOptimizer:
         suppliers: List[Dict[str, Any]] = []  # Transfer-out candidates
         receivers: List[Dict[str, Any]] = []  # Receive candidates
         
+        # Per-row fields and their defaults; absent columns are filled once so rows can be read as plain tuples
+        row_fields = {'Site': '', 'RP Type': '', 'SaSa Net Stock': 0, 'Pending Received': 0,
+                      'Safety Stock': 0, 'Effective Sold Qty': 0}
+        df = df.assign(**{col: default for col, default in row_fields.items() if col not in df.columns})
+        
         # Process by Article+OM grouping
         grouped = df.groupby(['Article', 'OM'])
         
@@ -81,13 +84,8 @@ class TransferOptimizer:
             # Calculate maximum sales quantity within group
             max_sold_qty = group['Effective Sold Qty'].max()
             
-            for _, row in group.iterrows():
-                site = row.get('Site', '')
-                rp_type = row.get('RP Type', '')
-                net_stock = row.get('SaSa Net Stock', 0)
-                pending_received = row.get('Pending Received', 0)
-                safety_stock = row.get('Safety Stock', 0)
-                sold_qty = row.get('Effective Sold Qty', 0)
+            for (site, rp_type, net_stock, pending_received,
+                 safety_stock, sold_qty) in group[list(row_fields)].itertuples(index=False, name=None):
                 
                 # Transfer-out rule - Priority 1: ND type transfer-out
                 if rp_type == 'ND':
@@ -254,24 +252,22 @@ class TransferOptimizer:
                 transfer_df.to_excel(writer, sheet_name='Transfer Suggestions', index=False)
             
             # Worksheet 2: Statistical Summary
-            self._generate_summary_dashboard(writer, transfer_suggestions, df)
+            self._generate_summary_dashboard(writer, transfer_df, df)
         
         logger.info(f"Output file generated: {output_file}")
         return output_file
     
     def _generate_summary_dashboard(self, writer, 
-                                  transfer_suggestions: List[Dict[str, Any]], 
+                                  transfer_df: pd.DataFrame, 
                                   original_df: pd.DataFrame):
         """Generate statistical summary"""
-        if not transfer_suggestions:
+        if transfer_df.empty:
             return
         
-        transfer_df = pd.DataFrame(transfer_suggestions)
-        
         # KPI Banner
         summary_data = {
             'Metric': ['Total Transfer Suggestions', 'Total Transfer Quantity'],
-            'Value': [len(transfer_suggestions), transfer_df['Transfer Qty'].sum()]
+            'Value': [len(transfer_df), transfer_df['Transfer Qty'].sum()]
         }
         kpi_df = pd.DataFrame(summary_data)
         kpi_df.to_excel(writer, sheet_name='Statistical Summary', startrow=0, index=False)